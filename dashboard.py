@@ -1,41 +1,21 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import io
-
-# Load dataset
-def load_data():
-    # Load both datasets
-    wanderdoll_df = pd.read_csv("wanderdoll_rating.csv")
-    oddmuse_df = pd.read_csv("oddmuse_rating.csv")  # Add your Odd Muse file
-    
-    # Add brand column to each dataset
-    wanderdoll_df["brand"] = "Wanderdoll"
-    oddmuse_df["brand"] = "Odd Muse"
-    
-    # Combine datasets
-    df = pd.concat([wanderdoll_df, oddmuse_df], ignore_index=True)
-    df["date"] = pd.to_datetime(df["date"])
-
-    # Add uploaded data if available
-    if 'uploaded_data' in st.session_state and st.session_state.uploaded_data:
-        uploaded_dfs = st.session_state.uploaded_data
-        for uploaded_df in uploaded_dfs:
-            df = pd.concat([df, uploaded_df], ignore_index=True)
-        
-    # Check for duplicates and remove them
-    original_count = len(df)
-    df = df.drop_duplicates(subset=["brand", "customer name", "review", "rating", "date"], keep='first')
-    duplicate_count = original_count - len(df)
-    return df
-
-df = load_data()
+import os
+import ahocorasick
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import xlsxwriter
 
 # Define categories
 categories = {
     "product_issue": ["too small", "too big", "wrong size", "poor fit", "too tight", "loose", "didn't fit", "short", "sizing",
-                      "Sizing" , "fit" , "didn't fit" , "too loose","height", "weight" , "poor sizing", "wrong size", "poor sizing information", 
+                      "fit" , "too loose","height", "weight" , "poor sizing", "poor sizing information", 
                       "lack of sizing information", "wrong sizing information","ordered wrong size", "don't know my size", "didn't know which size",
                     "which size" , "what's the length" , "what's the size" , "how tall" , "what size" , "is this suitable for" , "idk which size" , 
                       "what size is the model wearing ?", "How tall is the model?","Would this fit ?"],
@@ -45,20 +25,246 @@ categories = {
     "positive_experience": ["fantastic", "great", "smooth", "helpful", "excellent", "thank you", "amazing", "outstanding", "resolved", "fast", "quick"]
 }
 
-# Function to filter reviews by categories
-def filter_by_categories(df, selected_categories):
-    if not selected_categories:
-        return df
-    
-    all_keywords = []
-    for category in selected_categories:
-        all_keywords.extend(categories[category])
+# One bit per category in the cat_bits column
+category_bits = {category: 1 << i for i, category in enumerate(categories)}
+
+# Chart colors for each sentiment bucket
+sentiment_colors = {
+    "Positive (4-5★)": "#22c55e",
+    "Negative (1-2★)": "#ef4444",
+    "Neutral (3★)": "#fbbf24"
+}
+
+# Build one Aho-Corasick automaton over every keyword, mapping each keyword back to its category
+@st.cache_resource
+def build_automaton():
+    automaton = ahocorasick.Automaton()
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            automaton.add_word(keyword.lower(), (category, keyword))
+    automaton.make_automaton()
+    return automaton
+
+# Scan each review once and store the categories it matches as a cat_bits bitmask column
+def tag_categories(df):
+    automaton = build_automaton()
+    cat_bits = np.zeros(len(df), dtype=np.min_scalar_type(sum(category_bits.values())))
     
     # Check if matched_keywords column exists, if not use review
-    if "matched_keywords" in df.columns:
-        return df[df["matched_keywords"].str.contains("|".join(all_keywords), case=False, na=False)]
-    else:
-        return df[df["review"].str.contains("|".join(all_keywords), case=False, na=False)]
+    text_column = "matched_keywords" if "matched_keywords" in df.columns else "review"
+    texts = df[text_column].fillna("").str.lower()
+    
+    # Scan every row as one separator-joined buffer so the automaton runs in C over all text at once,
+    # then map hit positions back to rows through the row start offsets
+    lengths = texts.str.len().to_numpy(dtype=np.int64) + 1
+    row_starts = np.cumsum(lengths) - lengths
+    hit_ends = {category: [] for category in categories}
+    for end, (category, _) in automaton.iter("\0".join(texts.tolist())):
+        hit_ends[category].append(end)
+    for category, ends in hit_ends.items():
+        cat_bits[np.searchsorted(row_starts, ends, side="right") - 1] |= category_bits[category]
+    
+    return df.assign(cat_bits=cat_bits)
+
+# Derive per-row columns once at load so reruns don't recompute them
+def prepare_reviews(df):
+    # Keep review text in contiguous Arrow string buffers so string ops (e.g. lowercasing for tagging) run as Arrow kernels
+    text_columns = [col for col in ("customer name", "review", "matched_keywords") if col in df.columns]
+    df = df.astype({col: pd.ArrowDtype(pa.string()) for col in text_columns})
+    
+    rating = df["rating"].astype("int8").to_numpy()
+    sentiment = np.select([rating >= 4, rating <= 2], ["Positive (4-5★)", "Negative (1-2★)"], default="Neutral (3★)")
+    df = df.assign(
+        brand=df["brand"].astype("category"),
+        rating=rating,
+        sentiment=pd.Categorical(sentiment, categories=["Positive (4-5★)", "Neutral (3★)", "Negative (1-2★)"]),
+        day=df["date"].dt.normalize(),
+        week=df["date"].dt.to_period("W").dt.start_time,
+        month=df["date"].dt.to_period("M").dt.to_timestamp()
+    )
+    
+    # Hash the columns that define a duplicate into one 64-bit key, so deduplication is a single uint64 pass
+    # (dates are hashed as int64 nanoseconds so differently parsed resolutions still match)
+    dedupe_columns = pd.DataFrame({
+        "brand": df["brand"],
+        "customer name": df["customer name"],
+        "review": df["review"],
+        "rating": rating,
+        "date": df["date"].to_numpy().astype("datetime64[ns]").view("int64")
+    })
+    df["dedupe_key"] = pd.util.hash_pandas_object(dedupe_columns, index=False).to_numpy()
+    return tag_categories(df)
+
+# Columns the dashboard uses from the review files
+review_columns = ["brand", "customer name", "review", "rating", "date", "link", "matched_keywords"]
+
+# Read one brand's reviews as an Arrow table, keeping a typed Parquet snapshot (brand included) next to the CSV
+# so later loads skip CSV and date parsing and only read the columns the dashboard uses
+def read_reviews_table(csv_path, brand):
+    parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        if set(review_columns) <= set(pq.read_schema(parquet_path).names):
+            return pq.read_table(parquet_path, columns=review_columns)
+    
+    # Only parse the columns the dashboard uses, typed while reading
+    df = pd.read_csv(
+        csv_path,
+        engine="pyarrow",
+        usecols=[col for col in review_columns if col != "brand"],
+        dtype={"rating": "int8"},
+        parse_dates=["date"]
+    )
+    df["brand"] = brand
+    table = pa.Table.from_pandas(df[review_columns], preserve_index=False)
+    try:
+        pq.write_table(table, parquet_path)
+    except OSError:
+        pass  # Read-only checkout, keep loading from the CSV
+    return table
+
+# Load dataset - one read-only frame shared by every session and rerun (cache_resource, so it isn't copied per call)
+@st.cache_resource
+def load_reviews():
+    # Load both datasets and combine them as Arrow tables, converting to pandas once
+    table = pa.concat_tables([
+        read_reviews_table("wanderdoll_rating.csv", "Wanderdoll"),
+        read_reviews_table("oddmuse_rating.csv", "Odd Muse")  # Add your Odd Muse file
+    ], promote_options="permissive")
+    df = table.to_pandas(types_mapper={pa.large_string(): pd.ArrowDtype(pa.large_string())}.get)
+    
+    # Keep rows in date order so date windows can be found with a binary search
+    df = df.sort_values("date", kind="stable", ignore_index=True)
+    df = prepare_reviews(df)
+    return drop_duplicate_reviews(df)
+
+# Check for duplicates and remove them
+def drop_duplicate_reviews(df):
+    original_count = len(df)
+    df = df[~df["dedupe_key"].duplicated(keep='first').to_numpy()]
+    duplicate_count = original_count - len(df)
+    return df
+
+def load_data():
+    df = load_reviews()
+
+    # Add uploaded data if available (already prepared when it was added). The shared frame is never
+    # modified in place; merging builds a new one, kept in the session until another file is uploaded
+    if 'uploaded_data' in st.session_state and st.session_state.uploaded_data:
+        merged_key = tuple(st.session_state.get("uploaded_keys", []))
+        if st.session_state.get("merged_key") != merged_key:
+            uploaded_dfs = st.session_state.uploaded_data
+            for uploaded_df in uploaded_dfs:
+                df = pd.concat([df, uploaded_df], ignore_index=True)
+            # Concatenating different brand categories falls back to strings, so encode again
+            df["brand"] = df["brand"].astype("category")
+            df = df.sort_values("date", kind="stable", ignore_index=True)
+            st.session_state.merged_df = drop_duplicate_reviews(df)
+            st.session_state.merged_key = merged_key
+        df = st.session_state.merged_df
+    return df
+
+df = load_data()
+
+# Identifies the uploaded frames merged into df, so cached results are never shared across different data
+data_key = tuple(st.session_state.get("uploaded_keys", []))
+
+# Boolean mask of rows (optionally only the given row positions) matching any of the selected categories
+def category_mask(df, selected_categories, rows=slice(None)):
+    selected_bits = sum(category_bits[category] for category in selected_categories)
+    return (df["cat_bits"].to_numpy()[rows] & selected_bits) != 0
+
+# Row positions of each brand (plus "All Brands"), computed once per dataset
+@st.cache_data
+def brand_positions(_df, data_key):
+    codes = _df["brand"].cat.codes.to_numpy()
+    positions = {"All Brands": np.arange(len(_df))}
+    for code, brand in enumerate(_df["brand"].cat.categories):
+        positions[brand] = np.flatnonzero(codes == code)
+    return positions
+
+# Per-brand review count, rating histogram and category counts for the comparison tab, computed once per dataset
+@st.cache_data
+def brand_aggregates(_df, data_key):
+    ratings = _df["rating"].to_numpy(np.int8)
+    category_hits = {category: category_mask(_df, [category]) for category in categories}
+    aggregates = {}
+    for brand, rows in brand_positions(_df, data_key).items():
+        aggregates[brand] = {
+            "count": len(rows),
+            "ratings": np.bincount(ratings[rows], minlength=6),
+            "categories": {category: int(hits[rows].sum()) for category, hits in category_hits.items()}
+        }
+    return aggregates
+
+# Whole-dataset scalars shown next to the filtered figures, computed once per dataset
+@st.cache_data
+def dataset_summary(_df, data_key):
+    return {
+        "overall_avg": float(_df["rating"].mean()),
+        "min_date": _df["date"].min(),
+        "max_date": _df["date"].max()
+    }
+
+# Apply all sidebar filters with a single combined mask, cached per filter state.
+# Rows are in date order, so the date window is a range of positions found by binary search and the
+# brand's precomputed (ascending) row positions are cut to it the same way; the other masks only cover those rows
+@st.cache_data(max_entries=32)
+def apply_filters(_df, data_key, brand, start_date, end_date, ratings, selected_categories, show_all):
+    dates = _df["date"].to_numpy()
+    lo = np.searchsorted(dates, pd.to_datetime(start_date).to_datetime64(), side="left")
+    hi = np.searchsorted(dates, pd.to_datetime(end_date).to_datetime64(), side="right")
+    rows = brand_positions(_df, data_key)[brand]
+    rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+    masks = []
+    if ratings:  # Only apply if ratings are selected
+        # Lookup table indexed by the rating byte, so the rating mask is a single gather
+        keep = np.zeros(256, dtype=bool)
+        keep[np.asarray(ratings, dtype=np.uint8)] = True
+        masks.append(keep[_df["rating"].to_numpy()[rows].view(np.uint8)])
+    if not show_all and selected_categories:
+        masks.append(category_mask(_df, selected_categories, rows))
+    if masks:
+        rows = rows[np.logical_and.reduce(masks)]
+    return _df.iloc[rows]
+
+# Serialized downloads are cached per display state (passed as a cheap key instead of hashing the frame).
+# CSV is written by pyarrow's C++ writer; date columns without a time of day are written as plain dates
+@st.cache_data(max_entries=8)
+def to_csv_bytes(_df, display_key):
+    table = pa.Table.from_pandas(_df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if pa.types.is_timestamp(field.type) and pc.all(pc.equal(column, pc.floor_temporal(column, unit="day"))).as_py() is not False:
+            table = table.set_column(i, field.name, column.cast(pa.date32()))
+    csv_buffer = io.BytesIO()
+    pacsv.write_csv(table, csv_buffer)
+    return csv_buffer.getvalue()
+
+# Stream rows into an .xlsx with xlsxwriter's constant_memory mode so only one row is held at a time.
+# pandas' to_excel writes column by column, which constant_memory cannot handle, so rows are written here
+@st.cache_data(max_entries=8)
+def to_excel_bytes(_df, display_key):
+    excel_buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(excel_buffer, {"constant_memory": True, "strings_to_urls": False})
+    worksheet = workbook.add_worksheet("Reviews")
+    header_format = workbook.add_format({"bold": True})
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    date_columns = {i for i, dtype in enumerate(_df.dtypes) if pd.api.types.is_datetime64_any_dtype(dtype)}
+    
+    worksheet.write_row(0, 0, _df.columns.tolist(), header_format)
+    rows = _df.astype(object).where(_df.notna(), None).itertuples(index=False)
+    for row_idx, row in enumerate(rows, start=1):
+        for col_idx, value in enumerate(row):
+            worksheet.write(row_idx, col_idx, value, date_format if col_idx in date_columns else None)
+    workbook.close()
+    return excel_buffer.getvalue()
+
+# Parquet keeps the column types and is written straight from the Arrow columns, far faster than a spreadsheet
+@st.cache_data(max_entries=8)
+def to_parquet_bytes(_df, display_key):
+    parquet_buffer = io.BytesIO()
+    _df.to_parquet(parquet_buffer, index=False, engine="pyarrow")
+    return parquet_buffer.getvalue()
 
 # Dynamic title based on brand selection
 # Sidebar filters
@@ -80,15 +286,17 @@ else:
     brand_text = brand_options
 
 # Show total dataset info
-total_reviews = len(df) if brand_options == "All Brands" else len(df[df["brand"] == brand_options])
-st.info(f"📊 **{brand_text}**: {total_reviews} reviews from {df['date'].min().strftime('%Y-%m-%d')} to {df['date'].max().strftime('%Y-%m-%d')}")
+summary = dataset_summary(df, data_key)
+total_reviews = len(brand_positions(df, data_key)[brand_options])
+st.info(f"📊 **{brand_text}**: {total_reviews} reviews from {summary['min_date'].strftime('%Y-%m-%d')} to {summary['max_date'].strftime('%Y-%m-%d')}")
 
 # Create tabs
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "📋 Data", "🔄 Brand Comparison", "📤 Upload Data"])
+# Tabs track which one is open (switching reruns the app), so the Dashboard figures are only built while it is shown
+tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "📋 Data", "🔄 Brand Comparison", "📤 Upload Data"], key="active_tab", on_change="rerun")
 
 # Date range filter
-min_date = df["date"].min()
-max_date = df["date"].max()
+min_date = summary["min_date"]
+max_date = summary["max_date"]
 
 # Date range selector
 date_option = st.sidebar.selectbox(
@@ -132,188 +340,201 @@ with col2:
 if len(rating_options) == 5:
     st.sidebar.caption("✅ All ratings selected")
 
-# Category filter
-st.sidebar.subheader("🏷️ Filter by Categories")
-selected_categories = []
+# Category filter - one multiselect instead of a checkbox per category
+selected_categories = st.sidebar.multiselect(
+    "🏷️ Filter by Categories",
+    options=list(categories),
+    format_func=lambda category: category.replace("_", " ").title()
+)
 
-for category, keywords in categories.items():
-    category_name = category.replace("_", " ").title()
-    if st.sidebar.checkbox(f"{category_name}", key=category):
-        selected_categories.append(category)
-        with st.sidebar.expander(f"Keywords in {category_name}"):
-            st.write(", ".join(keywords))
+if selected_categories:
+    with st.sidebar.expander("Keywords in selected categories"):
+        for category in selected_categories:
+            st.write(f"**{category.replace('_', ' ').title()}:** {', '.join(categories[category])}")
 
 # Show all reviews option
 show_all = st.sidebar.checkbox("📋 Show All Reviews (ignore category filters)", value=not bool(selected_categories))
 
-# Apply filters
-filtered_df = df.copy()
-
-# Apply brand filter
-if brand_options != "All Brands":
-    filtered_df = filtered_df[filtered_df["brand"] == brand_options]
+# Apply filters - ratings and categories are sorted so the same selection always hits the same cache entry,
+# whatever order it was picked in
+filter_key = (brand_options, start_date, end_date, tuple(sorted(rating_options)), tuple(sorted(selected_categories)), show_all)
+filtered_df = apply_filters(df, data_key, *filter_key)
 
-# Apply date filter
-filtered_df = filtered_df[
-    (filtered_df["date"] >= pd.to_datetime(start_date)) &
-    (filtered_df["date"] <= pd.to_datetime(end_date))
-]
-
-# Apply rating filter - Fixed to handle data type mismatch
-if rating_options:  # Only apply if ratings are selected
-    # Convert both to the same type for comparison
-    filtered_df = filtered_df[filtered_df["rating"].astype(int).isin(rating_options)]
-
-# Apply category filter
-if not show_all and selected_categories:
-    filtered_df = filter_by_categories(filtered_df, selected_categories)
-
-# Dashboard Tab
-with tab1:
-    st.header("📈 Analytics Overview")
+# Dashboard Tab - skipped entirely while another tab is open
+if tab1.open:
+    with tab1:
+        st.header("📈 Analytics Overview")
     
-    # Show filtering info
-    if not show_all and selected_categories:
-        category_names = [cat.replace("_", " ").title() for cat in selected_categories]
-        st.info(f"🔍 Filtered by categories: {', '.join(category_names)}")
-    elif show_all:
-        st.info("📋 Showing all reviews (no category filter applied)")
+        # Show filtering info
+        if not show_all and selected_categories:
+            category_names = [cat.replace("_", " ").title() for cat in selected_categories]
+            st.info(f"🔍 Filtered by categories: {', '.join(category_names)}")
+        elif show_all:
+            st.info("📋 Showing all reviews (no category filter applied)")
     
-    # Summary metrics
-    col1, col2, col3, col4 = st.columns(4)
+        # Summary metrics
+        col1, col2, col3, col4 = st.columns(4)
     
-    if not filtered_df.empty:
-        with col1:
-            st.metric("Total Reviews", len(filtered_df), delta=f"of {len(df)} total")
+        if not filtered_df.empty:
+            # One histogram over the ratings drives all four metrics and the distribution chart
+            rating_hist = np.bincount(filtered_df["rating"].to_numpy(np.int8), minlength=6)
+            review_count = int(rating_hist.sum())
         
-        with col2:
-            avg_rating = filtered_df["rating"].mean()
-            overall_avg = df["rating"].mean()
-            delta = avg_rating - overall_avg
-            st.metric("Average Rating", f"{avg_rating:.1f}", delta=f"{delta:+.1f}")
+            with col1:
+                st.metric("Total Reviews", review_count, delta=f"of {len(df)} total")
         
-        with col3:
-            positive_count = len(filtered_df[filtered_df["rating"] >= 4])
-            positive_pct = (positive_count / len(filtered_df)) * 100
-            st.metric("Positive Reviews", f"{positive_pct:.1f}%", delta=f"{positive_count} reviews")
+            with col2:
+                avg_rating = (rating_hist * np.arange(len(rating_hist))).sum() / review_count
+                overall_avg = summary["overall_avg"]
+                delta = avg_rating - overall_avg
+                st.metric("Average Rating", f"{avg_rating:.1f}", delta=f"{delta:+.1f}")
         
-        with col4:
-            negative_count = len(filtered_df[filtered_df["rating"] <= 2])
-            negative_pct = (negative_count / len(filtered_df)) * 100
-            st.metric("Negative Reviews", f"{negative_pct:.1f}%", delta=f"{negative_count} reviews")
+            with col3:
+                positive_count = int(rating_hist[4:].sum())
+                positive_pct = (positive_count / review_count) * 100
+                st.metric("Positive Reviews", f"{positive_pct:.1f}%", delta=f"{positive_count} reviews")
         
-        # Charts row
-        col1, col2 = st.columns(2)
+            with col4:
+                negative_count = int(rating_hist[:3].sum())
+                negative_pct = (negative_count / review_count) * 100
+                st.metric("Negative Reviews", f"{negative_pct:.1f}%", delta=f"{negative_count} reviews")
         
-        with col1:
-            # Bar chart for ratings distribution
-            st.subheader("⭐ Rating Distribution")
-            rating_counts = filtered_df["rating"].value_counts().sort_index()
-            fig_bar = px.bar(
-                x=rating_counts.index,
-                y=rating_counts.values,
-                title="Reviews by Star Rating",
-                labels={"x": "Star Rating", "y": "Number of Reviews"},
-                color=rating_counts.values,
-                color_continuous_scale="RdYlBu_r",
-                text=rating_counts.values
-            )
-            fig_bar.update_layout(showlegend=False)
-            fig_bar.update_xaxes(tickmode='array', tickvals=[1, 2, 3, 4, 5])
-            fig_bar.update_traces(texttemplate='%{text}', textposition='outside')
-            st.plotly_chart(fig_bar, use_container_width=True)
+            # Figures only depend on the data and the sidebar filters, so keep the ones for recent filter states
+            # in the session and reuse them when a rerun (or toggling a filter off and on again) comes back to one
+            dashboard_key = (data_key,) + filter_key
+            figure_cache = st.session_state.setdefault("dashboard_figure_cache", {})
+            if dashboard_key not in figure_cache:
+                if len(figure_cache) >= 32:
+                    figure_cache.pop(next(iter(figure_cache)))  # Drop the oldest filter state
+                figure_cache[dashboard_key] = {}
+            dashboard_figs = figure_cache[dashboard_key]
         
-        with col2:
-            # Pie chart for positive/negative reviews
-            st.subheader("😊 Sentiment Distribution")
-            sentiment_counts = filtered_df["rating"].apply(
-                lambda x: "Positive (4-5★)" if x >= 4 else "Negative (1-2★)" if x <= 2 else "Neutral (3★)"
-            ).value_counts()
-            fig_pie = px.pie(
-                names=sentiment_counts.index,
-                values=sentiment_counts.values,
-                title="Overall Sentiment",
-                color_discrete_map={
-                    "Positive (4-5★)": "#22c55e", 
-                    "Negative (1-2★)": "#ef4444", 
-                    "Neutral (3★)": "#fbbf24"
-                }
-            )
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig_pie, use_container_width=True)
+            # Charts row
+            col1, col2 = st.columns(2)
         
-        # Category analysis if categories are selected
-        if not show_all and selected_categories:
-            st.subheader("🏷️ Category Analysis")
+            with col1:
+                # Bar chart for ratings distribution
+                st.subheader("⭐ Rating Distribution")
+                if "bar" not in dashboard_figs:
+                    present_ratings = np.flatnonzero(rating_hist)
+                    fig_bar = go.Figure(go.Bar(
+                        x=present_ratings,
+                        y=rating_hist[present_ratings],
+                        text=rating_hist[present_ratings],
+                        texttemplate='%{text}',
+                        textposition='outside',
+                        marker=dict(color=rating_hist[present_ratings], colorscale="RdYlBu_r")
+                    ))
+                    fig_bar.update_layout(
+                        title="Reviews by Star Rating",
+                        xaxis_title="Star Rating",
+                        yaxis_title="Number of Reviews",
+                        showlegend=False
+                    )
+                    fig_bar.update_xaxes(tickmode='array', tickvals=[1, 2, 3, 4, 5])
+                    dashboard_figs["bar"] = fig_bar
+                st.plotly_chart(dashboard_figs["bar"], use_container_width=True)
+        
+            with col2:
+                # Pie chart for positive/negative reviews
+                st.subheader("😊 Sentiment Distribution")
+                if "pie" not in dashboard_figs:
+                    sentiment_counts = filtered_df["sentiment"].value_counts()
+                    sentiment_counts = sentiment_counts[sentiment_counts > 0]
+                    fig_pie = go.Figure(go.Pie(
+                        labels=sentiment_counts.index,
+                        values=sentiment_counts.values,
+                        marker_colors=[sentiment_colors[label] for label in sentiment_counts.index],
+                        textposition='inside',
+                        textinfo='percent+label'
+                    ))
+                    fig_pie.update_layout(title="Overall Sentiment")
+                    dashboard_figs["pie"] = fig_pie
+                st.plotly_chart(dashboard_figs["pie"], use_container_width=True)
+        
+            # Category analysis if categories are selected
+            if not show_all and selected_categories:
+                st.subheader("🏷️ Category Analysis")
             
-            # Show breakdown by selected categories
-            category_data = []
-            for category in selected_categories:
-                cat_df = filter_by_categories(df, [category])
-                # Apply same filters as main dashboard
-                if brand_options != "All Brands":
-                    cat_df = cat_df[cat_df["brand"] == brand_options]
-                cat_df = cat_df[
-                    (cat_df["date"] >= pd.to_datetime(start_date)) &
-                    (cat_df["date"] <= pd.to_datetime(end_date)) &
-                    (cat_df["rating"].astype(int).isin(rating_options))
-                ]
-                
-                category_data.append({
-                    "Category": category.replace("_", " ").title(),
-                    "Count": len(cat_df),
-                    "Avg Rating": cat_df["rating"].mean() if len(cat_df) > 0 else 0,
-                    "Positive %": (len(cat_df[cat_df["rating"] >= 4]) / len(cat_df) * 100) if len(cat_df) > 0 else 0
-                })
+                # Show breakdown by selected categories. filtered_df already has the brand/date/rating
+                # filters applied and holds every row of each selected category, so its cat_bits are enough.
+                # All categories are reduced at once over a rows x categories hit matrix
+                selected_bits = np.array([category_bits[category] for category in selected_categories])
+                hits = (filtered_df["cat_bits"].to_numpy()[:, None] & selected_bits) != 0
+                filtered_ratings = filtered_df["rating"].to_numpy(np.int64)
+                counts = hits.sum(axis=0)
+                safe_counts = np.maximum(counts, 1)  # Categories without reviews show 0
             
-            category_df = pd.DataFrame(category_data)
-            st.dataframe(category_df, use_container_width=True)
+                category_df = pd.DataFrame({
+                    "Category": [category.replace("_", " ").title() for category in selected_categories],
+                    "Count": counts,
+                    "Avg Rating": filtered_ratings @ hits / safe_counts,
+                    "Positive %": np.count_nonzero(hits & (filtered_ratings >= 4)[:, None], axis=0) / safe_counts * 100
+                })
+                st.dataframe(category_df, use_container_width=True)
         
-        # Positive vs Negative Reviews Timeline - Monthly view
-        st.subheader("📈 Monthly Sentiment Trends")
-
-        if not filtered_df.empty:
-            # Create sentiment categories
-            timeline_data = filtered_df.copy()
-            timeline_data['sentiment'] = timeline_data['rating'].apply(
-                lambda x: 'Positive (4-5★)' if x >= 4 else 'Negative (1-2★)' if x <= 2 else 'Neutral (3★)'
-            )
-
-            # Group by month and sentiment
-            timeline_data['month'] = timeline_data['date'].dt.to_period('M')
-            timeline_df = timeline_data.groupby(['month', 'sentiment']).size().reset_index()
-            timeline_df.columns = ['Month', 'Sentiment', 'Count']
-            timeline_df['Month'] = timeline_df['Month'].dt.to_timestamp()
-
-            if len(timeline_df) > 0:
-                fig_timeline = px.line(
-                    timeline_df,
-                    x='Month',
-                    y='Count',
-                    color='Sentiment',
-                    title='Monthly Sentiment Trends',
-                    markers=True,
-                    line_shape='spline',
-                    color_discrete_map={
-                        'Positive (4-5★)': '#22c55e',
-                        'Negative (1-2★)': '#ef4444', 
-                        'Neutral (3★)': '#fbbf24'
-                    }
-                )
-                fig_timeline.update_layout(
-                    hovermode='x unified',
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
-                )
-                st.plotly_chart(fig_timeline, use_container_width=True)
+            # Positive vs Negative Reviews Timeline - bucket size follows the selected range,
+            # so long ranges don't send one point per day to the chart
+            span_days = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days
+            if span_days <= 90:
+                bucket_column, bucket_name, bucket_label = "day", "Day", "Daily"
+            elif span_days <= 730:
+                bucket_column, bucket_name, bucket_label = "week", "Week", "Weekly"
+            else:
+                bucket_column, bucket_name, bucket_label = "month", "Month", "Monthly"
+            st.subheader(f"📈 {bucket_label} Sentiment Trends")
+
+            if not filtered_df.empty:
+                if "timeline" not in dashboard_figs:
+                    # Count reviews per (date bucket, sentiment) into a buckets x sentiments matrix with a single
+                    # bincount over the bucket codes and the sentiment's categorical codes. Rows are in date order,
+                    # so the bucket values are sorted and their codes are a running count of value changes
+                    bucket_values = filtered_df[bucket_column].to_numpy()
+                    new_bucket = np.r_[True, bucket_values[1:] != bucket_values[:-1]]
+                    buckets = bucket_values[new_bucket]
+                    bucket_codes = np.cumsum(new_bucket) - 1
+                    sentiments = filtered_df["sentiment"].cat.categories
+                    sentiment_codes = filtered_df["sentiment"].cat.codes.to_numpy()
+                    counts = np.bincount(
+                        bucket_codes * len(sentiments) + sentiment_codes,
+                        minlength=len(buckets) * len(sentiments)
+                    ).reshape(len(buckets), len(sentiments))
+
+                    fig_timeline = None
+                    if counts.any():
+                        fig_timeline = go.Figure()
+                        for i, sentiment in enumerate(sentiments):
+                            present = np.flatnonzero(counts[:, i])
+                            if len(present) == 0:
+                                continue
+                            fig_timeline.add_trace(go.Scatter(
+                                x=buckets[present],
+                                y=counts[present, i],
+                                name=sentiment,
+                                mode='lines+markers',
+                                line=dict(shape='spline', color=sentiment_colors[sentiment])
+                            ))
+                        fig_timeline.update_layout(
+                            title=f'{bucket_label} Sentiment Trends',
+                            xaxis_title=bucket_name,
+                            yaxis_title='Count',
+                            hovermode='x unified',
+                            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+                        )
+                    dashboard_figs["timeline"] = fig_timeline
+
+                if dashboard_figs["timeline"] is not None:
+                    st.plotly_chart(dashboard_figs["timeline"], use_container_width=True)
+                else:
+                    st.info("📊 Not enough data points for timeline visualization.")
             else:
-                st.info("📊 Not enough data points for timeline visualization.")
+                st.info("📊 No data available for timeline visualization.")
         else:
-            st.info("📊 No data available for timeline visualization.")
-    else:
-        st.warning("⚠️ No reviews match the selected filters. Please adjust your criteria.")
+            st.warning("⚠️ No reviews match the selected filters. Please adjust your criteria.")
 
-# Data Tab
-with tab2:
+# Data Tab - rendered as a fragment, so its own widgets (columns, sorting) only rerun this tab
+@st.fragment
+def render_data_tab():
     st.header("📋 Review Data")
     
     # Additional filters specific to data view
@@ -336,9 +557,13 @@ with tab2:
     
     # Display filtered data
     if not filtered_df.empty and show_columns:
-        # Sort data
-        ascending = sort_order == "Ascending"
-        display_df = filtered_df[show_columns].sort_values(sort_by, ascending=ascending)
+        # Sort data - the sorted view is kept in the session until the filters or view options change
+        display_key = (data_key,) + filter_key + (tuple(show_columns), sort_by, sort_order)
+        if st.session_state.get("display_key") != display_key:
+            ascending = sort_order == "Ascending"
+            st.session_state.display_df = filtered_df[show_columns].sort_values(sort_by, ascending=ascending)
+            st.session_state.display_key = display_key
+        display_df = st.session_state.display_df
         
         # Show filter summary
         filter_info = []
@@ -348,7 +573,7 @@ with tab2:
             category_names = [cat.replace("_", " ").title() for cat in selected_categories]
             filter_info.append(f"Categories: {', '.join(category_names)}")
         if len(rating_options) < 5:
-            filter_info.append(f"Ratings: {', '.join([str(int(r)) for r in sorted(rating_options)])}")
+            filter_info.append(f"Ratings: {', '.join([str(r) for r in sorted(rating_options)])}")
         filter_info.append(f"Date: {start_date} to {end_date}")
         
         st.info(f"🔍 **Active Filters:** {' | '.join(filter_info)}")
@@ -358,33 +583,35 @@ with tab2:
         
         # Download section
         st.subheader("💾 Download Data")
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         
         with col1:
-            # CSV download
-            csv_buffer = io.StringIO()
-            display_df.to_csv(csv_buffer, index=False)
+            # Downloads are only serialized when a button is clicked, and cached per display state
             filename_suffix = "_".join(selected_categories) if selected_categories else "all"
             brand_suffix = brand_options.lower().replace(" ", "_") if brand_options != "All Brands" else "all_brands"
             st.download_button(
                 label="📥 Download as CSV",
-                data=csv_buffer.getvalue(),
+                data=lambda: to_csv_bytes(display_df, display_key),
                 file_name=f"{brand_suffix}_reviews_{filename_suffix}_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv"
             )
         
         with col2:
-            # Excel download
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                display_df.to_excel(writer, index=False, sheet_name='Reviews')
             st.download_button(
                 label="📊 Download as Excel",
-                data=excel_buffer.getvalue(),
+                data=lambda: to_excel_bytes(display_df, display_key),
                 file_name=f"{brand_suffix}_reviews_{filename_suffix}_{datetime.now().strftime('%Y%m%d')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
         
+        with col3:
+            st.download_button(
+                label="🗃️ Download as Parquet",
+                data=lambda: to_parquet_bytes(display_df, display_key),
+                file_name=f"{brand_suffix}_reviews_{filename_suffix}_{datetime.now().strftime('%Y%m%d')}.parquet",
+                mime="application/vnd.apache.parquet"
+            )
+        
         # Data summary
         with st.expander("📈 Data Summary"):
             st.write(f"**Total Reviews:** {len(display_df)} (of {len(df)} in dataset)")
@@ -393,16 +620,24 @@ with tab2:
             if brand_options != "All Brands":
                 st.write(f"**Brand:** {brand_options}")
             st.write("**Rating Distribution:**")
-            rating_summary = display_df['rating'].value_counts().sort_index()
-            for rating, count in rating_summary.items():
-                percentage = (count / len(display_df)) * 100
-                st.write(f"  - {int(rating)} Star: {count} reviews ({percentage:.1f}%)")
+            # One table instead of a write call per rating
+            rating_summary = np.bincount(display_df['rating'].to_numpy(np.int8), minlength=6)
+            present_ratings = np.flatnonzero(rating_summary)
+            st.dataframe(pd.DataFrame({
+                "Stars": present_ratings,
+                "Reviews": rating_summary[present_ratings],
+                "%": (rating_summary[present_ratings] / len(display_df) * 100).round(1)
+            }), hide_index=True)
     
     else:
         st.warning("⚠️ No data to display. Please adjust your filters or select columns to show.")
 
-# Brand Comparison Tab
-with tab3:
+with tab2:
+    render_data_tab()
+
+# Brand Comparison Tab - a fragment too, so picking brands to compare only reruns this tab
+@st.fragment
+def render_brand_comparison_tab():
     st.header("🔄 Brand Comparison")
     
     # Get unique brands
@@ -422,9 +657,12 @@ with tab3:
                                 [b for b in available_brands if b != brand1], key="brand2")
         
         if brand1 and brand2:
-            # Filter data for each brand
-            brand1_data = df[df["brand"] == brand1]
-            brand2_data = df[df["brand"] == brand2]
+            # Cached per-brand aggregates drive the metrics, the distribution charts and the category table
+            aggregates = brand_aggregates(df, data_key)
+            brand1_stats = aggregates[brand1]
+            brand2_stats = aggregates[brand2]
+            brand1_count, brand1_ratings = brand1_stats["count"], brand1_stats["ratings"]
+            brand2_count, brand2_ratings = brand2_stats["count"], brand2_stats["ratings"]
             
             # Comparison metrics
             st.subheader("📊 Key Metrics Comparison")
@@ -432,22 +670,24 @@ with tab3:
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.metric(f"{brand1} Avg Rating", f"{brand1_data['rating'].mean():.1f}")
-                st.metric(f"{brand2} Avg Rating", f"{brand2_data['rating'].mean():.1f}")
+                brand1_avg = (brand1_ratings * np.arange(len(brand1_ratings))).sum() / brand1_count
+                brand2_avg = (brand2_ratings * np.arange(len(brand2_ratings))).sum() / brand2_count
+                st.metric(f"{brand1} Avg Rating", f"{brand1_avg:.1f}")
+                st.metric(f"{brand2} Avg Rating", f"{brand2_avg:.1f}")
             
             with col2:
-                st.metric(f"{brand1} Total Reviews", len(brand1_data))
-                st.metric(f"{brand2} Total Reviews", len(brand2_data))
+                st.metric(f"{brand1} Total Reviews", brand1_count)
+                st.metric(f"{brand2} Total Reviews", brand2_count)
             
             with col3:
-                brand1_positive = len(brand1_data[brand1_data["rating"] >= 4]) / len(brand1_data) * 100
-                brand2_positive = len(brand2_data[brand2_data["rating"] >= 4]) / len(brand2_data) * 100
+                brand1_positive = brand1_ratings[4:].sum() / brand1_count * 100
+                brand2_positive = brand2_ratings[4:].sum() / brand2_count * 100
                 st.metric(f"{brand1} Positive %", f"{brand1_positive:.1f}%")
                 st.metric(f"{brand2} Positive %", f"{brand2_positive:.1f}%")
             
             with col4:
-                brand1_negative = len(brand1_data[brand1_data["rating"] <= 2]) / len(brand1_data) * 100
-                brand2_negative = len(brand2_data[brand2_data["rating"] <= 2]) / len(brand2_data) * 100
+                brand1_negative = brand1_ratings[:3].sum() / brand1_count * 100
+                brand2_negative = brand2_ratings[:3].sum() / brand2_count * 100
                 st.metric(f"{brand1} Negative %", f"{brand1_negative:.1f}%")
                 st.metric(f"{brand2} Negative %", f"{brand2_negative:.1f}%")
             
@@ -457,26 +697,24 @@ with tab3:
             col1, col2 = st.columns(2)
             
             with col1:
-                brand1_ratings = brand1_data["rating"].value_counts().sort_index()
-                fig1 = px.bar(
-                    x=brand1_ratings.index,
-                    y=brand1_ratings.values,
-                    title=f"{brand1} Rating Distribution",
-                    labels={"x": "Rating", "y": "Count"},
-                    color_discrete_sequence=["#3b82f6"]
-                )
+                brand1_present = np.flatnonzero(brand1_ratings)
+                fig1 = go.Figure(go.Bar(
+                    x=brand1_present,
+                    y=brand1_ratings[brand1_present],
+                    marker_color="#3b82f6"
+                ))
+                fig1.update_layout(title=f"{brand1} Rating Distribution", xaxis_title="Rating", yaxis_title="Count")
                 fig1.update_xaxes(tickmode='array', tickvals=[1, 2, 3, 4, 5])
                 st.plotly_chart(fig1, use_container_width=True)
             
             with col2:
-                brand2_ratings = brand2_data["rating"].value_counts().sort_index()
-                fig2 = px.bar(
-                    x=brand2_ratings.index,
-                    y=brand2_ratings.values,
-                    title=f"{brand2} Rating Distribution",
-                    labels={"x": "Rating", "y": "Count"},
-                    color_discrete_sequence=["#ef4444"]
-                )
+                brand2_present = np.flatnonzero(brand2_ratings)
+                fig2 = go.Figure(go.Bar(
+                    x=brand2_present,
+                    y=brand2_ratings[brand2_present],
+                    marker_color="#ef4444"
+                ))
+                fig2.update_layout(title=f"{brand2} Rating Distribution", xaxis_title="Rating", yaxis_title="Count")
                 fig2.update_xaxes(tickmode='array', tickvals=[1, 2, 3, 4, 5])
                 st.plotly_chart(fig2, use_container_width=True)
             
@@ -485,19 +723,22 @@ with tab3:
             
             comparison_data = []
             for category, keywords in categories.items():
-                brand1_cat = filter_by_categories(brand1_data, [category])
-                brand2_cat = filter_by_categories(brand2_data, [category])
+                brand1_cat = brand1_stats["categories"][category]
+                brand2_cat = brand2_stats["categories"][category]
                 
                 comparison_data.append({
                     "Category": category.replace("_", " ").title(),
-                    f"{brand1} Count": len(brand1_cat),
-                    f"{brand1} %": len(brand1_cat) / len(brand1_data) * 100 if len(brand1_data) > 0 else 0,
-                    f"{brand2} Count": len(brand2_cat),
-                    f"{brand2} %": len(brand2_cat) / len(brand2_data) * 100 if len(brand2_data) > 0 else 0,
+                    f"{brand1} Count": brand1_cat,
+                    f"{brand1} %": brand1_cat / brand1_count * 100 if brand1_count > 0 else 0,
+                    f"{brand2} Count": brand2_cat,
+                    f"{brand2} %": brand2_cat / brand2_count * 100 if brand2_count > 0 else 0,
                 })
             
             comparison_df = pd.DataFrame(comparison_data)
             st.dataframe(comparison_df, use_container_width=True)
+
+with tab3:
+    render_brand_comparison_tab()
     
 # Upload Data Tab
 with tab4:
@@ -531,13 +772,28 @@ with tab4:
             mapped_df['customer name'] = new_df[customer_col] if customer_col != "Not Available" else "Anonymous"
             mapped_df['link'] = ""
             
-            # Add to session state
-            if 'uploaded_data' not in st.session_state:
-                st.session_state.uploaded_data = []
-            st.session_state.uploaded_data.append(mapped_df)
+            # Ratings are stored as whole-star int8 values, so reject ratings that would be truncated or wrap around
+            max_rating = np.iinfo(np.int8).max
+            ratings = mapped_df['rating']
+            invalid_ratings = ratings.isna() | (ratings % 1 != 0) | (ratings < 0) | (ratings > max_rating)
+            if invalid_ratings.any():
+                st.error(
+                    f"❌ {int(invalid_ratings.sum())} rows have a missing, non-whole or out-of-range rating. "
+                    f"Ratings must be whole numbers from 0 to {max_rating}; please fix the rating column and upload again."
+                )
+            else:
+                mapped_df = prepare_reviews(mapped_df)
+            
+                # Add to session state
+                if 'uploaded_data' not in st.session_state:
+                    st.session_state.uploaded_data = []
+                st.session_state.uploaded_data.append(mapped_df)
+                st.session_state.setdefault("uploaded_keys", []).append(
+                    int(pd.util.hash_pandas_object(mapped_df, index=False).sum())
+                )
             
-            st.success(f"🎉 Added {len(mapped_df)} reviews for {brand_name}!")
-            st.rerun()  # This refreshes the entire app with new data
+                st.success(f"🎉 Added {len(mapped_df)} reviews for {brand_name}!")
+                st.rerun()  # This refreshes the entire app with new data
 
 
 